@@ -1,6 +1,6 @@
 #!/bin/bash
 echo "Installing dependencies..."
-pip install -r lambda/requirements.txt -t lambda/  # Once-off, do not need to run again
+pip install -r lambda/requirements.txt -t lambda/  # Re-run whenever requirements.txt changes: ingestion needs the bundled boto3 pinned in requirements.txt (conditional writes)
 
 # Terraform will package/zip the lambda/ directory into a zip file
 
@@ -1,6 +1,17 @@
 import boto3
-import requests
+from botocore.config import Config
+from botocore.exceptions import ClientError
+import urllib3
+from urllib3.exceptions import HTTPError, ProtocolError, ReadTimeoutError
+from urllib3.util.retry import Retry
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+import io
+import json
+import queue
+import random
+import threading
 import time
 import os
 import logging
@@ -9,48 +20,174 @@ import logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+MB = 1024 * 1024
+
+# Pipelined transfer settings: each downloaded part is queued and uploaded
+# as an S3 multipart part while the rest of the file is still downloading
+PART_SIZE = 16 * MB
+PART_QUEUE_SIZE = 4
+DOWNLOAD_WORKERS = 8
+UPLOAD_WORKERS = 4
+
+# A range whose body is cut off mid-read is re-fetched (only that 16MB) with jittered backoff
+RANGE_ATTEMPTS = 3
+
+# Months transferred concurrently in a backfill invocation
+BACKFILL_WORKERS = 4
+
+# Socket read size when filling part buffers
+READ_CHUNK_SIZE = 1 * MB
+
+# Lambda network bandwidth scales with memory; 1769MB is one full vCPU and a
+# much faster NIC than the small tiers. Also leaves room for the part buffers.
+MIN_MEMORY_MB = 1769
+memory_mb = int(os.environ.get('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', '0'))
+if 0 < memory_mb < MIN_MEMORY_MB:
+    logger.warning("Lambda memory is %s MB; use at least %s MB for full download bandwidth", memory_mb, MIN_MEMORY_MB)
+
+# CloudWatch datums collected during an invocation, written as EMF by flush_metrics
+METRIC_BUFFER = []
+
+# Clients are created once per container and reused across warm invocations,
+# with botocore's standard (jittered exponential backoff) retry mode. The pool covers
+# every concurrent upload_part in a backfill plus headroom (botocore defaults to 10).
+BOTO_CONFIG = Config(
+    retries={'max_attempts': 5, 'mode': 'standard'},
+    max_pool_connections=BACKFILL_WORKERS * UPLOAD_WORKERS + 4
+)
+S3_CLIENT = boto3.client('s3', config=BOTO_CONFIG)
+
+# Shared urllib3 pool for the download path (no requests layer on the byte stream),
+# sized for the concurrent range requests.
+# Retry handles connection errors and 5xx responses with exponential backoff.
+POOL = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=50,
+    timeout=30,
+    retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        respect_retry_after_header=True
+    )
+)
+
+# NYC TLC trip data host
+TRIP_DATA_URL = "https://d37ci6vzurychx.cloudfront.net/trip-data/"
+
+# Open the pooled TLS connection during init so DNS + handshake are off the handler's
+# critical path. Any response (even 403/404) is fine; failures are ignored.
+try:
+    POOL.request('HEAD', TRIP_DATA_URL, timeout=5, retries=False)
+except Exception as e:
+    logger.warning("Could not pre-warm connection to %s: %s", TRIP_DATA_URL, e)
+
 def lambda_handler(event, context):
     logger.info("=== NYC Taxi Data Ingestion Started ===")
-    logger.info(f"Event: {event}")
-    logger.info(f"Context: {context}")
+    logger.info("Event: %s", event)
+    logger.info("Context: %s", context)
 
-    s3_client = boto3.client('s3')
-    cloudwatch = boto3.client('cloudwatch')
-    
     s3_bucket = os.getenv('S3_BUCKET') # Set in Lambda environment variables
     s3_prefix = os.getenv('S3_PREFIX') # Set in Lambda environment variables, e.g., "nyctaxi/raw/"
 
-    logger.info(f"Configuration - S3 Bucket: {s3_bucket}, Prefix: {s3_prefix}")
+    logger.info("Configuration - S3 Bucket: %s, Prefix: %s", s3_bucket, s3_prefix)
+
+    # Drop anything left over from a previous invocation in this container
+    METRIC_BUFFER.clear()
+
+    try:
+        # Backfill: event {"months": [[2024, 1], [2024, 2], ...]} processes several months concurrently
+        if event and event.get('months'):
+            target_months = parse_backfill_months(event['months'])
+            if target_months is None:
+                logger.error("Invalid months in backfill event: %s", event['months'])
+                return {
+                    'statusCode': 400,
+                    'body': "Invalid 'months': expected a list of [year, month] pairs"
+                }
+            logger.info("Backfilling %s months with %s workers", len(target_months), BACKFILL_WORKERS)
+            
+            with ThreadPoolExecutor(max_workers=BACKFILL_WORKERS) as executor:
+                results = list(executor.map(
+                    lambda year_month: ingest_month(s3_bucket, s3_prefix, *year_month),
+                    target_months
+                ))
+            
+            failed = [f"{year}-{month}" for (year, month), result in zip(target_months, results)
+                      if result['statusCode'] != 200]
+            return {
+                'statusCode': 500 if failed else 200,
+                'body': f"Failed months: {', '.join(failed)}" if failed
+                        else f"Successfully processed {len(target_months)} months"
+            }
+        
+        # Find the previous month
+        now = datetime.now()
+        target_date = now - timedelta(days=30)  # Previous month
+        year = str(target_date.year)
+        month = str(target_date.month).zfill(2)
+        logger.info("Target month: %s-%s", year, month)
+        
+        return ingest_month(s3_bucket, s3_prefix, year, month)
+    finally:
+        flush_metrics()
+
+def parse_backfill_months(months):
+    """Normalise [[2024, 1], ...] to [('2024', '01'), ...], or None if any entry is not a valid (year, month) pair"""
+    if not isinstance(months, list):
+        return None
     
-    # Find the previous month
-    now = datetime.now()
-    target_date = now - timedelta(days=30)  # Previous month
-    year = str(target_date.year)
-    month = str(target_date.month).zfill(2)
-    logger.info(f"Target month: {year}-{month}")
+    target_months = []
+    for entry in months:
+        if not isinstance(entry, (list, tuple)) or len(entry) != 2:
+            return None
+        try:
+            year, month = int(entry[0]), int(entry[1])
+        except (TypeError, ValueError):
+            return None
+        if not 1000 <= year <= 9999 or not 1 <= month <= 12:
+            return None
+        target_months.append((str(year), str(month).zfill(2)))
+    return target_months
 
+def ingest_month(bucket, prefix, year, month):
+    """Download one month into S3, record its job metric and return the Lambda response for it"""
     try:
-        # Check if already exists
-        if file_exists_in_s3(s3_client, s3_bucket, s3_prefix, year, month):
-            logger.warning(f"Data for {year}-{month} already exists in S3. Skipping download.")
-            put_skipped_metric(cloudwatch, year, month) 
+        # Cheap HEAD first so reruns don't download the whole month just to be rejected
+        if file_exists_in_s3(S3_CLIENT, bucket, prefix, year, month):
+            logger.warning("Data for %s-%s already exists in S3. Skipping download.", year, month)
+            put_skipped_metric(year, month)
             return {
                 'statusCode': 200,
                 'body': f"Data already exists for {year}-{month}"
             }
         
-        # Try to download
-        if process_month(s3_client, cloudwatch, s3_bucket, s3_prefix, year, month):
-            logger.info(f"Successfully processed {year}-{month}")
-            put_success_metric(cloudwatch, year, month)
+        # Try to download (the upload is also conditional, in case another run wrote it meanwhile)
+        if process_month(S3_CLIENT, bucket, prefix, year, month):
+            logger.info("Successfully processed %s-%s", year, month)
+            put_success_metric(year, month)
             return {
                 'statusCode': 200,
                 'body': f"Successfully processed {year}-{month}"
             }
         
+        put_failure_metric(year, month)
+        return {
+            'statusCode': 500,
+            'body': f"Failed to process {year}-{month}"
+        }
+        
     except Exception as e:
-        logger.error(f"Unexpected error in Lambda handler: {str(e)}", exc_info=True)
-        put_failure_metric(cloudwatch)
+        if is_already_exists_error(e):
+            logger.warning("Data for %s-%s already exists in S3. Skipping upload.", year, month)
+            put_skipped_metric(year, month)
+            return {
+                'statusCode': 200,
+                'body': f"Data already exists for {year}-{month}"
+            }
+        
+        logger.error("Unexpected error in Lambda handler: %s", e, exc_info=True)
+        put_failure_metric(year, month)
         return {
             'statusCode': 500,
             'body': f"Unexpected error: {str(e)}"
@@ -63,92 +200,327 @@ def file_exists_in_s3(s3_client, bucket, prefix, year, month):
     
     try:
         s3_client.head_object(Bucket=bucket, Key=s3_key)
-        print(f"File already exists: s3://{bucket}/{s3_key}")
+        logger.info("File already exists: s3://%s/%s", bucket, s3_key)
         return True
     except s3_client.exceptions.ClientError as e:
-        if e.response['Error']['Code'] == '404':
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
             return False
         else:
-            # Other error (permissions, etc.)
-            print(f"Error checking S3: {e}")
-            return False
+            # Other error (permissions, etc.) - fail now rather than download a file we can't upload
+            logger.error("Error checking S3: %s", e)
+            raise
 
-def process_month(s3_client, cloudwatch, bucket, prefix, year, month):
+def process_month(s3_client, bucket, prefix, year, month):
     """Process a specific month's data with performance metrics"""
     file_name = f"yellow_tripdata_{year}-{month}.parquet"
-    url = f"https://d37ci6vzurychx.cloudfront.net/trip-data/{file_name}"
+    url = f"{TRIP_DATA_URL}{file_name}"
     s3_key = f"{prefix}year={year}/month={month}/{file_name}"
     
     start_time = time.time()
-    download_success = False
-    file_size_bytes = 0
-    download_duration = 0
     
     try:
-        logger.info(f"Attempting download: {url}")
+        logger.info("Attempting download: %s", url)
         
-        for attempt in range(3):  # Retry logic
-            try:
-                attempt_start = time.time()
-                
-                # Download with timeout
-                response = requests.get(url, stream=True, timeout=30)
-                response.raise_for_status()
-                
-                # Get file size from headers
-                file_size_bytes = int(response.headers.get('content-length', 0))
-                logger.info(f"File size: {file_size_bytes} bytes ({file_size_bytes/1024/1024:.2f} MB)")
-                
-                # Upload to S3 and measure duration
-                upload_start = time.time()
-                s3_client.upload_fileobj(
-                    response.raw,
-                    bucket,
-                    s3_key
-                )
-                upload_duration = time.time() - upload_start
-                
-                # Calculate total download duration
-                download_duration = time.time() - attempt_start
-                download_success = True
-                
-                logger.info(f"Successfully uploaded to s3://{bucket}/{s3_key}")
-                logger.info(f"Download & upload completed in {download_duration:.2f} seconds")
-                logger.info(f"Upload only took {upload_duration:.2f} seconds")
-                logger.info(f"Throughput: {file_size_bytes/download_duration/1024/1024:.2f} MB/s")
-                
-                # Send performance metrics to CloudWatch
-                send_performance_metrics(
-                    cloudwatch, 
-                    year, 
-                    month, 
-                    download_duration, 
-                    upload_duration,
-                    file_size_bytes,
-                    True  # success
-                )
-                
-                return True
-                
-            except requests.exceptions.RequestException as e:
-                attempt_duration = time.time() - attempt_start
-                logger.warning(f"Attempt {attempt + 1} failed in {attempt_duration:.2f}s: {e}")
-                
-                # Log failed attempt metrics
-                if attempt == 2:  # Last attempt
-                    send_performance_metrics(cloudwatch, year, month, attempt_duration, 0, 0, False)  # failure                    
-                    raise
-                time.sleep(2 ** attempt)  # Exponential backoff
+        # Transient HTTP failures are retried by the pool's Retry policy
+        # Get file size from headers
+        head = POOL.request('HEAD', url)
+        raise_for_status(head, url)
+        file_size_bytes = int(head.headers.get('content-length', 0))
+        accepts_ranges = head.headers.get('accept-ranges', '').lower() == 'bytes'
+        logger.info("File size: %d bytes (%.2f MB)", file_size_bytes, file_size_bytes / 1024 / 1024)
+        
+        # Download and upload in one pipeline, parts go to S3 as they arrive
+        upload_tail_duration = transfer_to_s3(
+            s3_client,
+            url,
+            bucket,
+            s3_key,
+            file_size_bytes,
+            accepts_ranges
+        )
+        
+        # Calculate total download duration
+        download_duration = time.time() - start_time
+        
+        logger.info("Successfully uploaded to s3://%s/%s", bucket, s3_key)
+        logger.info("Download & upload completed in %.2f seconds", download_duration)
+        logger.info("Upload finished %.2f seconds after download", upload_tail_duration)
+        logger.info("Throughput: %.2f MB/s", file_size_bytes / download_duration / 1024 / 1024)
+        
+        # Queue performance metrics for CloudWatch
+        send_performance_metrics(
+            year, 
+            month, 
+            download_duration, 
+            upload_tail_duration,
+            file_size_bytes,
+            True  # success
+        )
+        
+        return True
                 
     except Exception as e:
+        if is_already_exists_error(e):
+            raise  # Not a failure - the handler records it as skipped
+        
         error_duration = time.time() - start_time
-        logger.error(f"Failed {file_name} after {error_duration:.2f}s: {str(e)}")        
+        logger.error("Failed %s after %.2fs: %s", file_name, error_duration, e)        
         # Log final failure metrics
-        send_performance_metrics(cloudwatch, year, month, error_duration, 0, 0, False)  # failure        
+        send_performance_metrics(year, month, error_duration, 0, 0, False)  # failure        
         return False
 
-def send_performance_metrics(cloudwatch, year, month, download_duration, upload_duration, file_size_bytes, success):
-    """Send detailed performance metrics to CloudWatch"""
+def is_already_exists_error(error):
+    """True if error is S3 rejecting a conditional write because the key exists"""
+    return isinstance(error, ClientError) and error.response['Error']['Code'] == 'PreconditionFailed'
+
+class TransferAborted(Exception):
+    """Raised by a pipeline stage that stops because another stage has already failed"""
+
+class PartBufferPool:
+    """
+    Reusable PART_SIZE bytearrays for the transfer pipeline.
+    Buffers are allocated on first use, up to size, then recycled between parts.
+    """
+    def __init__(self, size):
+        self._free = queue.Queue()
+        for _ in range(size):
+            self._free.put(None)
+    
+    def acquire(self):
+        buffer = self._free.get()
+        return buffer if buffer is not None else bytearray(PART_SIZE)
+    
+    def release(self, buffer):
+        self._free.put(buffer)
+
+class PartReader(io.RawIOBase):
+    """Seekable read-only file over a memoryview, so upload_part sends a pooled buffer without copying it"""
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    def readinto(self, b):
+        size = min(len(b), len(self._view) - self._position)
+        b[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+    
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, min(offset, len(self._view)))
+        return self._position
+    
+    def tell(self):
+        return self._position
+
+def raise_for_status(response, url):
+    """Raise HTTPError for 4xx/5xx responses (urllib3 returns them instead of raising)"""
+    if response.status >= 400:
+        raise HTTPError(f"HTTP {response.status} for {url}")
+
+@contextmanager
+def open_stream(url, headers=None):
+    """
+    GET url without preloading the body.
+    The connection goes back to POOL for keep-alive reuse on success, and is closed
+    on error so a half-read response is never reused.
+    """
+    response = POOL.request('GET', url, headers=headers, preload_content=False)
+    try:
+        raise_for_status(response, url)
+        yield response
+    except BaseException:
+        response.close()
+        raise
+    response.release_conn()
+
+def read_into(raw, view):
+    """Fill view from a urllib3 response in READ_CHUNK_SIZE reads, returning the bytes read"""
+    size = 0
+    while size < len(view):
+        n = raw.readinto(view[size:size + READ_CHUNK_SIZE])
+        if not n:
+            break
+        size += n
+    return size
+
+def transfer_to_s3(s3_client, url, bucket, s3_key, file_size_bytes, accepts_ranges):
+    """
+    Stream url into an S3 multipart upload.
+    Downloaded parts go through a bounded queue to upload workers, so the
+    upload overlaps the download. Returns the seconds the upload ran past the download.
+    """
+    upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=s3_key)['UploadId']
+    part_queue = queue.Queue(maxsize=PART_QUEUE_SIZE)
+    # Enough buffers for every part that can be downloading, queued or uploading at once
+    buffers = PartBufferPool(DOWNLOAD_WORKERS + PART_QUEUE_SIZE + UPLOAD_WORKERS)
+    # Set by the first failing download or upload so every other stage stops early
+    transfer_failed = threading.Event()
+    uploaded_parts = []
+    upload_errors = []
+    
+    def put_part(part_number, buffer, size):
+        if transfer_failed.is_set():
+            buffers.release(buffer)
+            raise TransferAborted("Aborting download: transfer failed")
+        part_queue.put((part_number, buffer, size))
+    
+    def upload_worker():
+        while True:
+            item = part_queue.get()
+            if item is None:
+                return
+            part_number, buffer, size = item
+            try:
+                if transfer_failed.is_set():
+                    continue  # Keep draining so the producer never blocks
+                response = s3_client.upload_part(
+                    Bucket=bucket,
+                    Key=s3_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=PartReader(memoryview(buffer)[:size]),
+                    ContentLength=size
+                )
+                uploaded_parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+            except Exception as e:
+                logger.error("Upload of part %s failed: %s", part_number, e)
+                upload_errors.append(e)
+                transfer_failed.set()
+            finally:
+                buffers.release(buffer)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as uploaders:
+            for _ in range(UPLOAD_WORKERS):
+                uploaders.submit(upload_worker)
+            try:
+                if accepts_ranges and file_size_bytes > PART_SIZE:
+                    produce_ranges(url, file_size_bytes, buffers, put_part, transfer_failed)
+                else:
+                    produce_stream(url, buffers, put_part, transfer_failed)
+            except Exception:
+                transfer_failed.set()  # Don't upload parts still queued
+                raise
+            finally:
+                # One sentinel per worker so they all exit
+                for _ in range(UPLOAD_WORKERS):
+                    part_queue.put(None)
+            download_done = time.time()
+        
+        if upload_errors:
+            raise upload_errors[0]
+        
+        s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=s3_key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': sorted(uploaded_parts, key=lambda part: part['PartNumber'])},
+            IfNoneMatch='*'  # Fails with PreconditionFailed if the key already exists
+        )
+        return time.time() - download_done
+    except Exception as e:
+        # Don't leave orphaned parts behind (they are billed as storage). A failed abort
+        # is only logged so it can't mask the original error (e.g. PreconditionFailed).
+        try:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=s3_key, UploadId=upload_id)
+        except Exception as abort_error:
+            logger.error("Failed to abort multipart upload %s for %s: %s", upload_id, s3_key, abort_error)
+        # Report the S3 error rather than the producer's "Aborting download"
+        if upload_errors and e is not upload_errors[0]:
+            raise upload_errors[0] from e
+        raise
+
+def produce_stream(url, buffers, put_part, transfer_failed):
+    """Read url over a single connection and queue it in PART_SIZE parts"""
+    with open_stream(url) as response:
+        part_number = 1
+        while True:
+            if transfer_failed.is_set():
+                raise TransferAborted("Aborting download: transfer failed")
+            buffer = buffers.acquire()
+            try:
+                size = read_into(response, memoryview(buffer))
+            except Exception:
+                buffers.release(buffer)
+                raise
+            if not size:
+                buffers.release(buffer)
+                break
+            put_part(part_number, buffer, size)
+            part_number += 1
+
+def produce_ranges(url, file_size_bytes, buffers, put_part, transfer_failed):
+    """
+    Fetch url as concurrent PART_SIZE byte ranges and queue each one as a part.
+    The first failure sets transfer_failed, which stops the other ranges before their next GET.
+    """
+    ranges = [(start, min(start + PART_SIZE, file_size_bytes) - 1)
+              for start in range(0, file_size_bytes, PART_SIZE)]
+    logger.info("Downloading in %s ranges with %s workers", len(ranges), DOWNLOAD_WORKERS)
+    
+    def check_not_failed():
+        if transfer_failed.is_set():
+            raise TransferAborted("Aborting download: transfer failed")
+    
+    def fetch_range(part_number, byte_range):
+        start, end = byte_range
+        expected = end - start + 1
+        try:
+            check_not_failed()
+            buffer = buffers.acquire()
+        except Exception:
+            transfer_failed.set()
+            raise
+        try:
+            for attempt in range(RANGE_ATTEMPTS):
+                check_not_failed()
+                try:
+                    with open_stream(url, headers={'Range': f'bytes={start}-{end}'}) as response:
+                        if response.status != 206:
+                            raise HTTPError(f"Range request not honoured for bytes {start}-{end}")
+                        size = read_into(response, memoryview(buffer)[:expected])
+                    if size != expected:
+                        raise ProtocolError(f"Incomplete range bytes {start}-{end}: got {size} bytes")
+                    break
+                except (ProtocolError, ReadTimeoutError) as e:
+                    # The pool's Retry only covers connecting and status codes, not a body cut off mid-read
+                    if attempt == RANGE_ATTEMPTS - 1:
+                        raise
+                    logger.warning("Range bytes %s-%s failed (attempt %s): %s", start, end, attempt + 1, e)
+                    time.sleep(random.uniform(0, 0.5 * 2 ** attempt))
+        except Exception:
+            buffers.release(buffer)
+            transfer_failed.set()
+            raise
+        put_part(part_number, buffer, size)
+    
+    executor = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS)
+    try:
+        futures = [executor.submit(fetch_range, part_number, byte_range)
+                   for part_number, byte_range in enumerate(ranges, start=1)]
+        # Return as soon as any range fails, not when an in-order map reaches it
+        wait(futures, return_when=FIRST_EXCEPTION)
+    finally:
+        # Skip the ranges that haven't started yet if one has failed
+        executor.shutdown(wait=True, cancel_futures=True)
+    
+    errors = [f.exception() for f in futures if not f.cancelled() and f.exception()]
+    if errors:
+        # Prefer the root cause over the other ranges' TransferAborted
+        raise next((e for e in errors if not isinstance(e, TransferAborted)), errors[0])
+
+def send_performance_metrics(year, month, download_duration, upload_tail_duration, file_size_bytes, success):
+    """Queue detailed performance metrics for CloudWatch"""
     try:
         metric_data = []
         
@@ -164,15 +536,15 @@ def send_performance_metrics(cloudwatch, year, month, download_duration, upload_
             'Unit': 'Seconds'
         })
         
-        # Upload duration metric (only for successful downloads)
-        if success and upload_duration > 0:
+        # Time the upload ran past the end of the download (only for successful downloads)
+        if success and upload_tail_duration > 0:
             metric_data.append({
-                'MetricName': 'UploadDuration',
+                'MetricName': 'UploadTailDuration',
                 'Dimensions': [
                     {'Name': 'Year', 'Value': year},
                     {'Name': 'Month', 'Value': month}
                 ],
-                'Value': upload_duration,
+                'Value': upload_tail_duration,
                 'Unit': 'Seconds'
             })
         
@@ -212,70 +584,75 @@ def send_performance_metrics(cloudwatch, year, month, download_duration, upload_
                 'Unit': 'Megabytes/Second'
             })
         
-        # Send all metrics in one call (more efficient)
-        if metric_data:
-            cloudwatch.put_metric_data(
-                Namespace='NYCTaxiDownload',
-                MetricData=metric_data
-            )
-            logger.debug(f"Sent {len(metric_data)} performance metrics to CloudWatch")
+        METRIC_BUFFER.extend(metric_data)
+        logger.debug("Queued %s performance metrics", len(metric_data))
             
     except Exception as e:
-        logger.error(f"Failed to send performance metrics to CloudWatch: {e}")
+        logger.error("Failed to queue performance metrics: %s", e)
+
+def put_job_metric(metric_name, year, month):
+    """Queue a job status count metric"""
+    METRIC_BUFFER.append({
+        'MetricName': metric_name,
+        'Dimensions': [
+            {'Name': 'Year', 'Value': year},
+            {'Name': 'Month', 'Value': month}
+        ],
+        'Value': 1.0,
+        'Unit': 'Count'
+    })
 
-def put_success_metric(cloudwatch, year, month):
+def put_success_metric(year, month):
     """Record overall job success"""
-    try:
-        cloudwatch.put_metric_data(
-            Namespace='NYCTaxiDownload',
-            MetricData=[{
-                'MetricName': 'JobSuccess',
-                'Dimensions': [
-                    {'Name': 'Year', 'Value': year},
-                    {'Name': 'Month', 'Value': month}
-                ],
-                'Value': 1.0,
-                'Unit': 'Count'
-            }]
-        )
-        logger.info(f"Recorded job success for {year}-{month}")
-    except Exception as e:
-        logger.error(f"Failed to record success metric: {e}")
+    put_job_metric('JobSuccess', year, month)
+    logger.info("Recorded job success for %s-%s", year, month)
 
-def put_failure_metric(cloudwatch, year, month):
+def put_failure_metric(year, month):
     """Record overall job failure"""
-    try:
-        cloudwatch.put_metric_data(
-            Namespace='NYCTaxiDownload',
-            MetricData=[{
-                'MetricName': 'JobFailure', 
-                'Dimensions': [
-                    {'Name': 'Year', 'Value': year},
-                    {'Name': 'Month', 'Value': month}
-                ],
-                'Value': 1.0,
-                'Unit': 'Count'
-            }]
-        )
-        logger.error(f"Recorded job failure for {year}-{month}")
-    except Exception as e:
-        logger.error(f"Failed to record failure metric: {e}")
+    put_job_metric('JobFailure', year, month)
+    logger.error("Recorded job failure for %s-%s", year, month)
 
-def put_skipped_metric(cloudwatch, year, month):
+def put_skipped_metric(year, month):
     """Record skipped download (already exists)"""
+    put_job_metric('JobSkipped', year, month)
+    logger.info("Recorded job skipped for %s-%s", year, month)
+
+def flush_metrics():
+    """
+    Write all queued metrics to stdout in CloudWatch Embedded Metric Format (EMF).
+    CloudWatch extracts the metrics from the log stream, so no API call is made.
+    """
+    if not METRIC_BUFFER:
+        return
     try:
-        cloudwatch.put_metric_data(
-            Namespace='NYCTaxiDownload',
-            MetricData=[{
-                'MetricName': 'JobSkipped',
-                'Dimensions': [
-                    {'Name': 'Year', 'Value': year},
-                    {'Name': 'Month', 'Value': month}
-                ],
-                'Value': 1.0,
-                'Unit': 'Count'
-            }]
-        )
-        logger.info(f"Recorded job skipped for {year}-{month}")
+        # One EMF document per dimension set; repeated metric names become value arrays
+        documents = {}
+        for datum in METRIC_BUFFER:
+            dimensions = {d['Name']: d['Value'] for d in datum['Dimensions']}
+            group_key = tuple(sorted(dimensions.items()))
+            document = documents.setdefault(group_key, {'dimensions': dimensions, 'metrics': {}, 'values': {}})
+            document['metrics'].setdefault(datum['MetricName'], datum['Unit'])
+            document['values'].setdefault(datum['MetricName'], []).append(datum['Value'])
+        
+        timestamp = int(time.time() * 1000)
+        for document in documents.values():
+            emf = {
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': 'NYCTaxiDownload',
+                        'Dimensions': [list(document['dimensions'])],
+                        'Metrics': [{'Name': name, 'Unit': unit} for name, unit in document['metrics'].items()]
+                    }]
+                },
+                **document['dimensions']
+            }
+            for name, values in document['values'].items():
+                emf[name] = values[0] if len(values) == 1 else values
+            # print, not logger: EMF lines must be bare JSON without the log record prefix
+            print(json.dumps(emf), flush=True)
+        logger.info("Emitted %s metrics as EMF", len(METRIC_BUFFER))
     except Exception as e:
-        logger.error(f"Failed to record skipped metric: {e}")
+        logger.error("Failed to emit metrics: %s", e)
+    finally:
+        METRIC_BUFFER.clear()
@@ -1,27 +1,53 @@
 import json
 import boto3
+from botocore.config import Config
 import os
-import re
+import time
 import logging
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Setup logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+SECRETS_CLIENT = boto3.client('secretsmanager', config=Config(retries={'max_attempts': 5, 'mode': 'standard'}))
+
+# Shared HTTP session so the Databricks connection is kept alive between events
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=1)
+))
+
+# Warm the Databricks connection during init; the adapter's max_retries bounds how long this can take
+def _prewarm_connection():
+    host = os.environ.get('DATABRICKS_HOST')
+    if not host:
+        return
+    try:
+        SESSION.head(host, timeout=5)
+    except Exception as e:
+        logger.warning("Could not pre-warm connection to Databricks: %s", e)
+
+_prewarm_connection()
+
+# Databricks token cached across warm invocations
+TOKEN_CACHE_TTL = 300  # seconds
+_TOKEN_CACHE = {'value': None, 'expires': 0}
+
 def lambda_handler(event, context):
     """
     Lambda function triggered by S3 events via EventBridge
     Triggers Databricks job for NYC taxi data processing
     """
     
-    logger.info(f"Received event: {json.dumps(event, default=str)}")
+    # Full event only at DEBUG; %-args are not formatted unless the record is emitted
+    logger.debug("Full event: %s", event)
     
     try:
-        # Initialize AWS clients
-        cloudwatch = boto3.client('cloudwatch')
-        
         # Extract S3 details from EventBridge event
         detail = event.get('detail', {})
         bucket = detail.get('bucket', {}).get('name')
@@ -34,38 +60,35 @@ def lambda_handler(event, context):
                 'body': json.dumps('Invalid event structure')
             }
         
-        logger.info(f"Processing S3 event: s3://{bucket}/{key}")
+        logger.info("Received event bucket=%s key=%s", bucket, key)
         
         # Validate it's a yellow taxi file
         if 'yellow_tripdata' not in key or not key.endswith('.parquet'):
-            logger.info(f"Skipping non-yellow-taxi file: {key}")
+            logger.info("Skipping non-yellow-taxi file: %s", key)
             return {
                 'statusCode': 200,
                 'body': json.dumps('Not a yellow taxi parquet file - skipping')
             }
         
         # Extract year/month from S3 key pattern: nyctaxi/raw/year=2024/month=01/yellow_tripdata_2024-01.parquet
-        year_match = re.search(r'year=(\d{4})', key)
-        month_match = re.search(r'month=(\d{2})', key)
+        key_date = parse_year_month(key)
         
-        if not year_match or not month_match:
-            logger.error(f"Could not extract year/month from key: {key}")
+        if not key_date:
+            logger.error("Could not extract year/month from key: %s", key)
             return {
                 'statusCode': 400, 
                 'body': json.dumps('Could not extract year/month from S3 key')
             }
         
-        year = year_match.group(1)
-        month = month_match.group(1)
+        year, month = key_date
         
-        logger.info(f"Extracted date: Year={year}, Month={month}")
+        logger.info("Extracted date: Year=%s, Month=%s", year, month)
         
         # Trigger Databricks job
         job_run_id = trigger_databricks_job(bucket, key, year, month)
         
         # Send success metric to CloudWatch
         send_cloudwatch_metric(
-            cloudwatch,
             'JobTriggered',
             1,
             [
@@ -75,7 +98,7 @@ def lambda_handler(event, context):
             ]
         )
         
-        logger.info(f"Successfully triggered Databricks job. Run ID: {job_run_id}")
+        logger.info("Successfully triggered Databricks job. Run ID: %s", job_run_id)
         
         return {
             'statusCode': 200,
@@ -89,13 +112,11 @@ def lambda_handler(event, context):
         }
         
     except Exception as e:
-        logger.error(f"Error processing event: {str(e)}")
+        logger.error("Error processing event: %s", e)
         
         # Send failure metric
         try:
-            cloudwatch = boto3.client('cloudwatch')
             send_cloudwatch_metric(
-                cloudwatch,
                 'JobTriggerFailed',
                 1,
                 [{'Name': 'Error', 'Value': str(e)[:50]}]  # CloudWatch dimension value max 255 chars
@@ -111,6 +132,24 @@ def lambda_handler(event, context):
             })
         }
 
+def parse_year_month(key):
+    """
+    Extract (year, month) from a key ending in year=YYYY/month=MM/<file>, or None
+    """
+    parts = key.split('/')
+    if len(parts) < 3:
+        return None
+    
+    year_part, month_part = parts[-3], parts[-2]
+    if not year_part.startswith('year=') or not month_part.startswith('month='):
+        return None
+    
+    year = year_part[len('year='):]
+    month = month_part[len('month='):]
+    if len(year) != 4 or not year.isdigit() or len(month) != 2 or not month.isdigit():
+        return None
+    return year, month
+
 def trigger_databricks_job(bucket, key, year, month):
     """
     Trigger Databricks job using REST API with requests library
@@ -121,20 +160,11 @@ def trigger_databricks_job(bucket, key, year, month):
     databricks_job_id = os.environ['DATABRICKS_JOB_ID']
     secret_arn = os.environ['DATABRICKS_SECRET_ARN']
     
-    # Get Databricks token from Secrets Manager
-    databricks_token = get_databricks_token(secret_arn)
-
-    logger.debug(f"Using Databricks host: {databricks_host}, Job ID: {databricks_job_id}, Secret ARN: {secret_arn}")
+    logger.debug("Using Databricks host: %s, Job ID: %s, Secret ARN: %s", databricks_host, databricks_job_id, secret_arn)
     
     # Databricks API endpoint
     api_url = f"{databricks_host}/api/2.1/jobs/run-now"
     
-    # Headers
-    headers = {
-        'Authorization': f'Bearer {databricks_token}',
-        'Content-Type': 'application/json'
-    }
-    
     # Job parameters
     payload = {
         'job_id': int(databricks_job_id),
@@ -146,53 +176,82 @@ def trigger_databricks_job(bucket, key, year, month):
         }
     }
     
-    logger.info(f"Triggering Databricks job {databricks_job_id} with params: {payload['notebook_params']}")
+    logger.info("Triggering Databricks job %s with params: %s", databricks_job_id, payload['notebook_params'])
     
     # Make API call
-    response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+    response = post_with_token(api_url, secret_arn, payload)
     
     if response.status_code == 200:
         result = response.json()
         run_id = result.get('run_id')
-        logger.info(f"Databricks job triggered successfully. Run ID: {run_id}")
+        logger.info("Databricks job triggered successfully. Run ID: %s", run_id)
         return run_id
     else:
         error_msg = f"Databricks API error: {response.status_code} - {response.text}"
         logger.error(error_msg)
         raise Exception(error_msg)
 
+def post_with_token(api_url, secret_arn, payload):
+    """
+    POST payload to the Databricks API. If the cached token is rejected (e.g. it was
+    rotated in Secrets Manager), drop it and retry once with a freshly fetched token.
+    """
+    for attempt in range(2):
+        # Get Databricks token from Secrets Manager
+        databricks_token = get_databricks_token(secret_arn)
+        
+        # Headers
+        headers = {
+            'Authorization': f'Bearer {databricks_token}',
+            'Content-Type': 'application/json'
+        }
+        
+        response = SESSION.post(api_url, headers=headers, json=payload, timeout=30)
+        if response.status_code not in (401, 403) or attempt == 1:
+            return response
+        
+        logger.warning("Databricks rejected the cached token (%s), refreshing it", response.status_code)
+        _TOKEN_CACHE['value'] = None
+        _TOKEN_CACHE['expires'] = 0
+
 def get_databricks_token(secret_arn):
     """
-    Retrieve Databricks token from AWS Secrets Manager
+    Retrieve Databricks token from AWS Secrets Manager, cached for TOKEN_CACHE_TTL seconds
     """
+    now = time.time()
+    if _TOKEN_CACHE['value'] and now < _TOKEN_CACHE['expires']:
+        return _TOKEN_CACHE['value']
+    
     try:
-        secrets_client = boto3.client('secretsmanager')
-        response = secrets_client.get_secret_value(SecretId=secret_arn)
+        response = SECRETS_CLIENT.get_secret_value(SecretId=secret_arn)
         secret = json.loads(response['SecretString'])
+        _TOKEN_CACHE['value'] = secret['token']
+        _TOKEN_CACHE['expires'] = now + TOKEN_CACHE_TTL
         return secret['token']
     except Exception as e:
-        logger.error(f"Failed to retrieve Databricks token: {e}")
+        logger.error("Failed to retrieve Databricks token: %s", e)
         raise Exception(f"Failed to retrieve Databricks token: {e}")
 
-def send_cloudwatch_metric(cloudwatch_client, metric_name, value, dimensions=None):
-    """Send custom metrics to CloudWatch"""
+def send_cloudwatch_metric(metric_name, value, dimensions=None):
+    """Send custom metrics to CloudWatch as an Embedded Metric Format (EMF) log line"""
     try:
-        metric_data = {
-            'MetricName': metric_name,
-            'Value': value,
-            'Unit': 'Count',
-            'Timestamp': datetime.utcnow()
+        dimensions = {d['Name']: d['Value'] for d in dimensions or []}
+        emf = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': 'NYCTaxiProcessing',
+                    'Dimensions': [list(dimensions)],
+                    'Metrics': [{'Name': metric_name, 'Unit': 'Count'}]
+                }]
+            },
+            **dimensions,
+            metric_name: value
         }
         
-        if dimensions:
-            metric_data['Dimensions'] = dimensions
-        
-        cloudwatch_client.put_metric_data(
-            Namespace='NYCTaxiProcessing',
-            MetricData=[metric_data]
-        )
+        print(json.dumps(emf), flush=True)
         
-        logger.info(f"CloudWatch metric sent: {metric_name} = {value}")
+        logger.info("CloudWatch metric sent: %s = %s", metric_name, value)
     except Exception as e:
-        logger.error(f"Failed to send CloudWatch metric: {e}")
-        # Don't raise exception for metric failures
\ No newline at end of file
+        logger.error("Failed to send CloudWatch metric: %s", e)
+        # Don't raise exception for metric failures
@@ -26,7 +26,7 @@ resource "aws_lambda_function" "nyctaxi_ingestion" {
   handler       = "lambda_function.lambda_handler"
   runtime       = "python3.10"
   timeout       = 900  # 15 minutes
-  memory_size   = 512   # 512 MB
+  memory_size   = 1769  # 1769 MB = 1 full vCPU; network bandwidth scales with memory
 
   filename         = data.archive_file.ingestion_lambda_zip.output_path   # Path to the zipped code (below)
   source_code_hash = data.archive_file.ingestion_lambda_zip.output_base64sha256
@@ -80,7 +80,8 @@ resource "aws_iam_role_policy" "lambda_s3_policy" {
           "s3:PutObject",
           "s3:PutObjectAcl",
           "s3:GetObject",
-          "s3:ListBucket"
+          "s3:ListBucket",
+          "s3:AbortMultipartUpload"  # Clean up parts of a failed upload
         ]
         Resource = [
           "arn:aws:s3:::${var.s3_bucket_name}",
@@ -135,6 +136,25 @@ resource "aws_lambda_permission" "allow_cloudwatch" {
   source_arn    = aws_cloudwatch_event_rule.monthly_trigger.arn
 }
 
+# Backstop for multipart uploads the Lambda could not abort (e.g. it timed out mid-transfer).
+# Note: this resource manages the bucket's whole lifecycle configuration.
+resource "aws_s3_bucket_lifecycle_configuration" "raw_data_lifecycle" {
+  bucket = var.s3_bucket_name
+
+  rule {
+    id     = "abort-incomplete-multipart-uploads"
+    status = "Enabled"
+
+    filter {
+      prefix = "nyctaxi/raw/"
+    }
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+}
+
 # CloudWatch Log Group
 resource "aws_cloudwatch_log_group" "lambda_log_group" {
   name              = "/aws/lambda/${aws_lambda_function.nyctaxi_ingestion.function_name}"